@@ -15,9 +15,11 @@
 #    under the License.
 """This module implements functions for the Rebase Bot."""
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import ctypes
 import logging
+import mmap
 import os
-import shutil
 import subprocess
 import sys
 
@@ -26,6 +28,8 @@ import git.compat
 import github3
 import github3.exceptions as gh_exceptions
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 class RepoException(Exception):
@@ -45,39 +49,110 @@ app_credentials = os.path.join(CREDENTIALS_DIR, "app")
 cloner_credentials = os.path.join(CREDENTIALS_DIR, "cloner")
 user_credentials = os.path.join(CREDENTIALS_DIR, "user")
 
+# Mappings of credential files locked into memory. They must stay alive for
+# the pages to stay locked.
+_locked_credentials = []
+
+# A single connection pool shared by the Slack webhook and the GitHub
+# sessions, so connections are kept alive and reused between requests.
+# Retry only applies to idempotent methods, so we never create a PR twice.
+_HTTP_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[502, 503, 504],
+        raise_on_status=False,
+    ),
+)
+_SESSION = requests.Session()
+_SESSION.mount("https://", _HTTP_ADAPTER)
+
+# Slack notifications are posted in the background so they stay off the
+# critical path. A single worker keeps messages in order. Pending
+# notifications are still sent before exit, because the interpreter
+# joins executor threads at shutdown.
+_NOTIFY_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slack")
+
+# Unmerged ("u") git status --porcelain=v2 statuses that we can fix
+# UD - Modified/Deleted
+# AU - Renamed/Deleted
+_ALLOWED_CONFLICT_STATUSES = frozenset((b"UD", b"AU"))
+
+# Ordinary ("1") statuses of non-conflicting changes that we should ignore
+_ALLOWED_CHANGE_STATUSES = frozenset((b"M.", b"D.", b"A."))
+
+_OPEN_PULL_REQUESTS_QUERY = """
+query($owner: String!, $name: String!, $head: String!) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(headRefName: $head, states: OPEN, first: 100) {
+      nodes {
+        url
+        headRepositoryOwner {
+          login
+        }
+      }
+    }
+  }
+}
+"""
+
 
 def _message_slack(webhook_url, msg):
     if webhook_url is None:
         return
-    requests.post(webhook_url, json={"text": msg})
+    future = _NOTIFY_POOL.submit(
+        _SESSION.post, webhook_url, json={"text": msg}, timeout=5
+    )
+    future.add_done_callback(_log_slack_error)
+
+
+def _log_slack_error(future):
+    ex = future.exception()
+    if ex is not None:
+        logging.error("Failed to send a Slack notification: %s", ex)
+
+
+def _reset_go_mod_files(gitwd, source):
+    # Reset go.mod and go.sum to make sure they are the same as in the source.
+    # Only the files that exist in the source can be checked out from it.
+    source_ref = f"source/{source.branch}"
+    filenames = gitwd.git.ls_tree(
+        "--name-only", source_ref, "--", "go.mod", "go.sum"
+    ).splitlines()
+    if filenames:
+        gitwd.git.checkout(source_ref, "--", *filenames)
 
 
 def _commit_go_mod_updates(gitwd, source):
     try:
-        # Reset go.mod and go.sum to make sure they are the same as in the source
-        for filename in ["go.mod", "go.sum"]:
-            if not os.path.exists(filename):
-                continue
-            gitwd.remotes.source.repo.git.checkout(f"source/{source.branch}", filename)
-
-        proc = subprocess.run(
-            "go mod tidy", shell=True, check=True, capture_output=True
-        )
-        logging.debug("go mod tidy output: %s", proc.stdout.decode())
-        proc = subprocess.run(
-            "go mod vendor", shell=True, check=True, capture_output=True
-        )
-        logging.debug("go mod vendor output %s:", proc.stdout.decode())
-
-        gitwd.git.add(all=True)
+        _reset_go_mod_files(gitwd, source)
+
+        if not _go_modules_changed(gitwd):
+            logging.info("Go modules are already up to date")
+            return
+
+        for command in (["go", "mod", "tidy"], ["go", "mod", "vendor"]):
+            proc = subprocess.run(command, check=True, capture_output=True)
+            logging.debug("%s output: %s", " ".join(command), proc.stdout.decode())
+
+        # go mod tidy and vendor only touch these, so there's no need to scan
+        # the whole working tree. A pathspec must match something on disk or
+        # in HEAD, e.g. a vendor directory that was removed.
+        head_tree = gitwd.head.commit.tree
+        paths = [
+            path for path in ("go.mod", "go.sum", "vendor")
+            if os.path.exists(path) or path in head_tree
+        ]
+        gitwd.git.add("--all", "--", *paths)
     except subprocess.CalledProcessError as err:
         raise RepoException(
             f"Unable to update go modules: {err}: {err.stderr.decode()}"
         ) from err
 
-    if gitwd.is_dirty():
+    if _has_staged_changes(gitwd):
         try:
-            gitwd.git.add(all=True)
             gitwd.git.commit(
                 "-m", "UPSTREAM: <carry>: Updating and vendoring go modules "
                 "after an upstream rebase"
@@ -87,6 +162,41 @@ def _commit_go_mod_updates(gitwd, source):
             raise err
 
 
+def _has_staged_changes(gitwd):
+    # Everything we want to commit has been staged, so only the index needs
+    # comparing with HEAD, not the working tree.
+    try:
+        gitwd.git.diff_index("--quiet", "--cached", "HEAD", "--")
+    except git.GitCommandError:
+        # git diff-index --quiet exits with an error if there are differences
+        return True
+
+    return False
+
+
+def _go_modules_changed(gitwd):
+    try:
+        gitwd.git.diff("--quiet", "HEAD", "--", "go.mod", "go.sum")
+    except git.GitCommandError:
+        # git diff --quiet exits with an error if there are differences
+        return True
+
+    # go.mod and go.sum are the same as in HEAD, but the rebased code may
+    # import packages that aren't vendored yet, or vendor/ may be missing or
+    # inconsistent with go.mod. In vendor mode go list reports both without
+    # touching the network.
+    proc = subprocess.run(
+        ["go", "list", "-mod=vendor", "-deps", "-test", "./..."],
+        check=False,
+        capture_output=True,
+    )
+    if proc.returncode != 0:
+        logging.debug("go list output: %s", proc.stderr.decode())
+        return True
+
+    return False
+
+
 def _do_rebase(gitwd, source):
     logging.info("Performing rebase")
     try:
@@ -97,38 +207,30 @@ def _do_rebase(gitwd, source):
 
 
 def _resolve_conflict(gitwd):
-    proc = gitwd.git.status(porcelain=True, as_process=True)
-
-    # Conflict prefixes in porcelain mode that we can fix
-    # UD - Modified/Deleted
-    # AU - Renamed/Deleted
-    allowed_conflict_prefixes = ["UD ", "AU "]
-
-    # Non-conflict status prefixes that we should ignore
-    allowed_status_prefixes = ["M  ", "D  ", "A  "]
+    # With -z entries are NUL separated and filenames are never quoted. In v2
+    # format each entry starts with its type, followed by the XY status.
+    proc = gitwd.git.status("--porcelain=v2", "-z", as_process=True)
+    entries = proc.stdout.read().split(b"\0")
+    proc.wait()
 
     ud_files = []
-    for line in proc.stdout:
-        line = line.decode(git.compat.defenc)
-        file_status = line[:3]
-        if file_status in allowed_status_prefixes:
-            # There is a conflict we can't resolve
+    for entry in entries:
+        if entry == b"":
             continue
-        if file_status not in allowed_conflict_prefixes:
+        entry_type, file_status = entry[:1], entry[2:4]
+        if entry_type == b"1" and file_status in _ALLOWED_CHANGE_STATUSES:
+            # Not a conflict
+            continue
+        if entry_type != b"u" or file_status not in _ALLOWED_CONFLICT_STATUSES:
             # There is a conflict we can't resolve
             return False
-        filename = line[3:].rstrip('\n')
-        # Special characters are escaped
-        if filename[0] == filename[-1] == '"':
-            filename = filename[1:-1]
-            filename = filename.encode('ascii').\
-                decode('unicode_escape').\
-                encode('latin1').\
-                decode(git.compat.defenc)
-        ud_files.append(filename)
-
-    for ud_file in ud_files:
-        gitwd.git.rm(ud_file)
+        # Unmerged entries have 10 fields before the path. Only decode the
+        # filenames we actually use.
+        filename = entry.split(b" ", 10)[10]
+        ud_files.append(filename.decode(git.compat.defenc))
+
+    if ud_files:
+        gitwd.git.rm("--", *ud_files)
 
     gitwd.git.commit("--no-edit")
 
@@ -149,44 +251,66 @@ def _resolve_rebase_conflicts(gitwd):
         return _resolve_rebase_conflicts(gitwd)
 
 
-def _is_push_required(gitwd, dest, source, rebase):
+def _is_source_merged(gitwd, dest, source):
     # Check if the source head is already in dest
     try:
-        source_head_commit = getattr(gitwd.remotes.source.refs, source.branch).commit
-        branches_with_commit = gitwd.git.branch("-r", "--contains", source_head_commit)
-        if f"dest/{dest.branch}" in branches_with_commit:
-            logging.info("Dest branch already contains all latest changes.")
-            return False
+        gitwd.git.merge_base(
+            "--is-ancestor", f"source/{source.branch}", f"dest/{dest.branch}"
+        )
     except git.GitCommandError:
-        # if the source head hasn't been found in the dest repo git returns an error. In this case
-        # we need to ignore it and report that we need to perform a push.
-        pass
+        # git returns an error if the source head isn't an ancestor of the dest head.
+        return False
+
+    return True
 
+
+def _is_push_required(gitwd, rebase):
     # Check if there is nothing to update in the open rebase PR.
+    # Identical trees have identical SHAs, so there's no need to spawn git diff.
     if rebase.branch in gitwd.remotes.rebase.refs:
-        diff_index = gitwd.git.diff(f"rebase/{rebase.branch}")
-        if len(diff_index) == 0:
+        rebase_tree = gitwd.remotes.rebase.refs[rebase.branch].commit.tree
+        if gitwd.head.commit.tree == rebase_tree:
             logging.info("Existing rebase branch already contains source.")
             return False
 
     return True
 
 
-def _is_pr_available(dest_repo, rebase):
+def _is_pr_available(gh_app, dest, rebase):
     logging.info("Checking for existing pull request")
-    try:
-        gh_pr = dest_repo.pull_requests(head=f"{rebase.ns}:{rebase.branch}").next()
-        return gh_pr.html_url, True
-    except StopIteration:
-        pass
+    response = gh_app.session.post(
+        "https://api.github.com/graphql",
+        json={
+            "query": _OPEN_PULL_REQUESTS_QUERY,
+            "variables": {
+                "owner": dest.ns,
+                "name": dest.name,
+                "head": rebase.branch,
+            },
+        },
+    )
+    response.raise_for_status()
+    result = response.json()
+    if "errors" in result:
+        raise Exception(f"GitHub GraphQL query failed: {result['errors']}")
+
+    repository = result["data"]["repository"]
+    if repository is None:
+        raise Exception(f"Repository {dest.ns}/{dest.name} not found")
+
+    # headRefName only matches the branch name, so filter on the fork owner
+    for gh_pr in repository["pullRequests"]["nodes"]:
+        owner = gh_pr["headRepositoryOwner"]
+        if owner is not None and owner["login"].lower() == rebase.ns.lower():
+            return gh_pr["url"], True
 
     return "", False
 
 
 def _create_pr(gh_app, dest, source, rebase):
     logging.info("Creating a pull request")
-    # FIXME(mdbooth): This hack is because github3 doesn't support setting
-    # maintainer_can_modify to false when creating a PR.
+    # FIXME(mdbooth): We post the PR directly because github3 doesn't support
+    # setting maintainer_can_modify to false when creating a PR.
     #
     # When maintainer_can_modify is true, which is the default we can't change,
     # we get a 422 response from GitHub. The reason for this is that we're
@@ -197,25 +321,25 @@ def _create_pr(gh_app, dest, source, rebase):
     #
     # https://github.com/sigmavirus24/github3.py/issues/1031
 
-    gh_pr = gh_app._post(
+    response = gh_app.session.post(
         f"https://api.github.com/repos/{dest.ns}/{dest.name}/pulls",
-        data={
+        json={
             "title": f"Merge {source.url}:{source.branch} into {dest.branch}",
             "head": f"{rebase.ns}:{rebase.branch}",
             "base": dest.branch,
             "maintainer_can_modify": False,
         },
-        json=True,
     )
-    logging.info(gh_pr.json())
-    logging.info(gh_pr.raise_for_status())
+    logging.info(response.text)
+    response.raise_for_status()
 
-    return gh_pr.json()["html_url"]
+    return response.json()["html_url"]
 
 
 def _github_app_login(gh_app_id, gh_app_key):
     logging.info("Logging to GitHub as an Application")
     gh_app = github3.GitHub()
+    gh_app.session.mount("https://", _HTTP_ADAPTER)
     gh_app.login_as_app(gh_app_key, gh_app_id, expire_in=300)
     return gh_app
 
@@ -223,11 +347,13 @@ def _github_app_login(gh_app_id, gh_app_key):
 def _github_user_login(user_token):
     logging.info("Logging to GitHub as a User")
     gh_app = github3.GitHub()
+    gh_app.session.mount("https://", _HTTP_ADAPTER)
     gh_app.login(token=user_token)
     return gh_app
 
 
-def _github_login_for_repo(gh_app, gh_account, gh_repo_name, gh_app_id, gh_app_key):
+def _github_login_for_repo(gh_account, gh_repo_name, gh_app_id, gh_app_key):
+    gh_app = _github_app_login(gh_app_id, gh_app_key)
     try:
         install = gh_app.app_installation_for_repository(
             owner=gh_account, repository=gh_repo_name
@@ -244,6 +370,66 @@ def _github_login_for_repo(gh_app, gh_account, gh_repo_name, gh_app_id, gh_app_k
     return gh_app
 
 
+def _fetch_branch(gitwd, remote, branch, required=True):
+    logging.info("Fetching %s from %s", branch, remote)
+    refspec = f"+refs/heads/{branch}:refs/remotes/{remote}/{branch}"
+    try:
+        # We never use tags, so don't download the ones git would auto-follow.
+        # History and blobs can't be trimmed: rebase needs both.
+        # Fetches run concurrently and we don't read FETCH_HEAD, so don't
+        # have them all rewrite it.
+        gitwd.git.fetch("--no-tags", "--no-write-fetch-head", remote, refspec)
+    except git.GitCommandError as ex:
+        if required or "couldn't find remote ref" not in str(ex):
+            raise
+        logging.info("Branch %s doesn't exist in %s", branch, remote)
+        # Drop any stale tracking ref left over from a previous run
+        gitwd.git.update_ref("-d", f"refs/remotes/{remote}/{branch}")
+        return False
+    return True
+
+
+def _fetch_remotes(gitwd, fetches):
+    # Each fetch is a separate git process that spends most of its time
+    # waiting on the network, so we run them concurrently.
+    with ThreadPoolExecutor(max_workers=len(fetches)) as executor:
+        futures = [
+            executor.submit(_fetch_branch, gitwd, remote, branch, required)
+            for remote, branch, required in fetches
+        ]
+        for future in as_completed(futures):
+            # Re-raises the GitCommandError of a failed fetch
+            future.result()
+
+
+def _write_credentials(path, token):
+    # Only readable by us, and not inherited by the git processes we spawn
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC | os.O_CLOEXEC, 0o600)
+    try:
+        length = os.write(fd, token.encode("ascii"))
+        _lock_credentials(fd, length)
+    finally:
+        os.close(fd)
+
+
+def _lock_credentials(fd, length):
+    # Lock the tmpfs pages backing a credentials file so they can't be
+    # swapped out. This is best effort, as mlock is subject to
+    # RLIMIT_MEMLOCK.
+    try:
+        mapping = mmap.mmap(fd, length)
+        buf = (ctypes.c_char * length).from_buffer(mapping)
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.mlock(ctypes.c_void_p(ctypes.addressof(buf)), ctypes.c_size_t(length)) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+    except (OSError, ValueError, AttributeError) as ex:
+        logging.debug("Unable to lock credentials in memory: %s", ex)
+        return
+
+    _locked_credentials.append((mapping, buf))
+
+
 def _init_working_dir(
     source,
     dest,
@@ -264,53 +450,50 @@ def _init_working_dir(
         else:
             gitwd.create_remote(remote, url)
 
+    if user_auth:
+        dest_credentials = rebase_credentials = user_credentials
+    else:
+        dest_credentials, rebase_credentials = app_credentials, cloner_credentials
+
+    config_values = [
+        ("credential", "username", "x-access-token"),
+        ("credential", "useHttpPath", "true"),
+        ("merge", "renameLimit", 999999),
+    ]
+    for repo, credentials in [
+        (dest.url, dest_credentials),
+        (rebase.url, rebase_credentials),
+    ]:
+        config_values.append((
+            f'credential "{repo}"',
+            "helper",
+            f'"!f() {{ echo "password=$(cat {credentials})"; }}; f"',
+        ))
+    if git_email != "":
+        config_values.append(("user", "email", git_email))
+    if git_username != "":
+        config_values.append(("user", "name", git_username))
+
+    # The config file is parsed once and written once on exit
     with gitwd.config_writer() as config:
-        config.set_value("credential", "username", "x-access-token")
-        config.set_value("credential", "useHttpPath", "true")
-
-        if not user_auth:
-            for repo, credentials in [
-                (dest.url, app_credentials),
-                (rebase.url, cloner_credentials),
-            ]:
-                config.set_value(
-                    f'credential "{repo}"',
-                    "helper",
-                    f'"!f() {{ echo "password=$(cat {credentials})"; }}; f"',
-                )
-        else:
-            for repo, credentials in [
-                (dest.url, user_credentials),
-                (rebase.url, user_credentials),
-            ]:
-                config.set_value(
-                    f'credential "{repo}"',
-                    "helper",
-                    f'"!f() {{ echo "password=$(cat {credentials})"; }}; f"',
-                )
+        for section, option, value in config_values:
+            config.set_value(section, option, value)
+
+    _fetch_remotes(gitwd, [
+        ("dest", dest.branch, True),
+        ("source", source.branch, True),
+    ])
 
-        if git_email != "":
-            config.set_value("user", "email", git_email)
-        if git_username != "":
-            config.set_value("user", "name", git_username)
-        config.set_value("merge", "renameLimit", 999999)
+    return gitwd
 
-    logging.info("Fetching %s from dest", dest.branch)
-    gitwd.remotes.dest.fetch(dest.branch)
-    logging.info("Fetching %s from source", source.branch)
-    gitwd.remotes.source.fetch(source.branch)
 
+def _checkout_working_branch(gitwd, dest):
+    # This writes out the whole dest tree, so we only do it once we know
+    # there is something to rebase.
     working_branch = f"dest/{dest.branch}"
     logging.info("Checking out %s", working_branch)
 
-    logging.info(
-        "Checking for existing rebase branch %s in %s", rebase.branch, rebase.url)
-    rebase_ref = gitwd.git.ls_remote("rebase", rebase.branch, heads=True)
-    if len(rebase_ref) > 0:
-        logging.info("Fetching existing rebase branch")
-        gitwd.remotes.rebase.fetch(rebase.branch)
-
-    head_commit = gitwd.remotes.dest.refs.master.commit
+    head_commit = gitwd.remotes.dest.refs[dest.branch].commit
     if "rebase" in gitwd.heads:
         gitwd.heads.rebase.set_commit(head_commit)
     else:
@@ -318,8 +501,6 @@ def _init_working_dir(
     gitwd.head.reference = gitwd.heads.rebase
     gitwd.head.reset(index=True, working_tree=True)
 
-    return gitwd
-
 
 def run(
     source,
@@ -341,42 +522,59 @@ def run(
     # We want to avoid writing app credentials to disk. We write them to
     # files in /dev/shm/credentials and configure git to read them from
     # there as required.
-    # This isn't perfect because /dev/shm can still be swapped, but this
-    # whole executable can be swapped, so it's no worse than that.
-    if os.path.exists(CREDENTIALS_DIR) and os.path.isdir(CREDENTIALS_DIR):
-        shutil.rmtree(CREDENTIALS_DIR)
-
-    os.mkdir(CREDENTIALS_DIR)
+    # /dev/shm can still be swapped, so we also try to lock the credentials
+    # in memory. If that isn't permitted it's no worse than the rest of this
+    # executable, which can be swapped too.
+    os.makedirs(CREDENTIALS_DIR, mode=0o700, exist_ok=True)
+    for credentials in (app_credentials, cloner_credentials, user_credentials):
+        try:
+            os.unlink(credentials)
+        except FileNotFoundError:
+            pass
 
     user_auth = user_token != ""
 
     if user_auth:
+        # The same user credentials are used for both repos
         gh_app = _github_user_login(user_token)
-        gh_cloner_app = _github_user_login(user_token)
+        gh_cloner_app = gh_app
 
-        with open(user_credentials, "w", encoding='utf-8') as user_credentials_file:
-            user_credentials_file.write(user_token)
+        _write_credentials(user_credentials, user_token)
     else:
-        # App credentials for accessing the destination and opening a PR
-        gh_app = _github_app_login(gh_app_id, gh_app_key)
-        gh_app = _github_login_for_repo(
-            gh_app, dest.ns, dest.name, gh_app_id, gh_app_key)
-
-        # App credentials for writing to the rebase repo
-        gh_cloner_app = _github_app_login(gh_cloner_id, gh_cloner_key)
-        gh_cloner_app = _github_login_for_repo(
-            gh_cloner_app, rebase.ns, rebase.name, gh_cloner_id, gh_cloner_key
-        )
+        # Both logins sign a JWT and exchange it for an installation token,
+        # so we do them concurrently.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            # App credentials for accessing the destination and opening a PR
+            gh_app_future = executor.submit(
+                _github_login_for_repo, dest.ns, dest.name, gh_app_id, gh_app_key
+            )
+
+            # App credentials for writing to the rebase repo. If it's the same
+            # app installed on the same repo we can reuse the dest login.
+            if (gh_cloner_id, rebase.ns, rebase.name) == (gh_app_id, dest.ns, dest.name):
+                gh_cloner_app_future = gh_app_future
+            else:
+                gh_cloner_app_future = executor.submit(
+                    _github_login_for_repo,
+                    rebase.ns,
+                    rebase.name,
+                    gh_cloner_id,
+                    gh_cloner_key,
+                )
 
-        with open(app_credentials, "w", encoding='utf-8') as app_credentials_file:
-            app_credentials_file.write(gh_app.session.auth.token)
-        with open(cloner_credentials, "w", encoding='utf-8') as cloner_credentials_file:
-            cloner_credentials_file.write(gh_cloner_app.session.auth.token)
+            gh_app = gh_app_future.result()
+            gh_cloner_app = gh_cloner_app_future.result()
+
+        _write_credentials(app_credentials, gh_app.session.auth.token)
+        _write_credentials(cloner_credentials, gh_cloner_app.session.auth.token)
 
     try:
         dest_repo = gh_app.repository(dest.ns, dest.name)
         logging.info("Destination repository is %s", dest_repo.clone_url)
-        rebase_repo = gh_cloner_app.repository(rebase.ns, rebase.name)
+        if gh_cloner_app is gh_app and (rebase.ns, rebase.name) == (dest.ns, dest.name):
+            rebase_repo = dest_repo
+        else:
+            rebase_repo = gh_cloner_app.repository(rebase.ns, rebase.name)
         logging.info("rebase repository is %s", rebase_repo.clone_url)
     except Exception as ex:
         logging.exception(ex)
@@ -409,11 +607,27 @@ def run(
         )
         return False
 
+    # If dest already contains source there is nothing to rebase, and
+    # nothing we would do to the result would be pushed anyway.
+    source_merged = _is_source_merged(gitwd, dest, source)
+
+    rebase_fetch = None
     try:
-        _do_rebase(gitwd, source)
+        if source_merged:
+            logging.info("Dest branch already contains all latest changes.")
+        else:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                # The existing rebase branch is only needed to decide whether
+                # to push, so fetch it while we rebase. It may not exist yet.
+                rebase_fetch = executor.submit(
+                    _fetch_branch, gitwd, "rebase", rebase.branch, False
+                )
 
-        if update_go_modules:
-            _commit_go_mod_updates(gitwd, source)
+                _checkout_working_branch(gitwd, dest)
+                _do_rebase(gitwd, source)
+
+                if update_go_modules:
+                    _commit_go_mod_updates(gitwd, source)
     except RepoException as ex:
         logging.error(ex)
         _message_slack(
@@ -435,12 +649,32 @@ def run(
         )
         return False
 
+    if rebase_fetch is not None:
+        try:
+            rebase_fetch.result()
+        except Exception as ex:
+            logging.exception(ex)
+            _message_slack(
+                slack_webhook,
+                f"I got an error fetching {rebase.ns}/{rebase.name}:{rebase.branch}: {ex}"
+            )
+            return False
+
     if dry_run:
         logging.info("Dry run mode is enabled. Do not create a PR.")
         return True
 
-    push_required = _is_push_required(gitwd, dest, source, rebase)
-    pr_url, pr_available = _is_pr_available(dest_repo, rebase)
+    push_required = not source_merged and _is_push_required(gitwd, rebase)
+
+    try:
+        pr_url, pr_available = _is_pr_available(gh_app, dest, rebase)
+    except Exception as ex:
+        logging.exception(ex)
+        _message_slack(
+            slack_webhook,
+            f"I got an error checking for an existing rebase PR: {ex}"
+        )
+        return False
 
     try:
         if push_required:
@@ -20,14 +20,25 @@ import argparse
 from collections import namedtuple
 import re
 import sys
-import validators
-
-from rebasebot import bot
 
 
 GitHubBranch = namedtuple("GitHubBranch", ["url", "ns", "name", "branch"])
 GitBranch = namedtuple("GitBranch", ["url", "branch"])
 
+GITHUBBRANCH = re.compile("^(?P<ns>[^/]+)/(?P<name>[^:]+):(?P<branch>.*)$")
+
+_FORM_TEXT = (
+    "in the form <user or organisation>/<repo>:<branch>, "
+    "e.g. kubernetes/cloud-provider-openstack:master"
+)
+_SOURCE_HELP = (
+    "The source/upstream git repo to rebase changes onto in the form "
+    "<git url>:<branch>. Note that unlike dest and rebase this does "
+    "not need to be a GitHub url, hence its syntax is different."
+)
+_DEST_HELP = f"The destination/downstream GitHub repo to merge changes into {_FORM_TEXT}"
+_REBASE_HELP = f"The base GitHub repo that will be used to create a pull request {_FORM_TEXT}"
+
 
 class GitHubBranchAction(argparse.Action):
     """An action to take a GitHub branch argument in the form:
@@ -37,10 +48,8 @@ class GitHubBranchAction(argparse.Action):
     The argument will be returned as a GitHubBranch object.
     """
 
-    GITHUBBRANCH = re.compile("^(?P<ns>[^/]+)/(?P<name>[^:]+):(?P<branch>.*)$")
-
     def __call__(self, parser, namespace, values, option_string=None):
-        match = self.GITHUBBRANCH.match(values)
+        match = GITHUBBRANCH.match(values)
         if match is None:
             parser.error(
                 f"GitHub branch value for {option_string} must be in "
@@ -68,6 +77,9 @@ class GitBranchAction(argparse.Action):
     """
 
     def __call__(self, parser, namespace, values, option_string=None):
+        # Imported here so --help and argument errors don't pay for it
+        import validators  # pylint: disable=import-outside-toplevel
+
         msg = (
             f"Git branch value for {option_string} must be in "
             f"the form <git url>:<branch>"
@@ -89,11 +101,6 @@ class GitBranchAction(argparse.Action):
 #
 # testing_args should be left empty, except for during testing
 def _parse_cli_arguments(testing_args=None):
-    _form_text = (
-        "in the form <user or organisation>/<repo>:<branch>, "
-        "e.g. kubernetes/cloud-provider-openstack:master"
-    )
-
     parser = argparse.ArgumentParser(
         description="Rebase on changes from an upstream repo")
     parser.add_argument(
@@ -102,11 +109,7 @@ def _parse_cli_arguments(testing_args=None):
         type=str,
         required=True,
         action=GitBranchAction,
-        help=(
-            "The source/upstream git repo to rebase changes onto in the form "
-            "<git url>:<branch>. Note that unlike dest and rebase this does "
-            "not need to be a GitHub url, hence its syntax is different."
-        ),
+        help=_SOURCE_HELP,
     )
     parser.add_argument(
         "--dest",
@@ -114,14 +117,14 @@ def _parse_cli_arguments(testing_args=None):
         type=str,
         required=True,
         action=GitHubBranchAction,
-        help=f"The destination/downstream GitHub repo to merge changes into {_form_text}",
+        help=_DEST_HELP,
     )
     parser.add_argument(
         "--rebase",
         type=str,
         required=True,
         action=GitHubBranchAction,
-        help=f"The base GitHub repo that will be used to create a pull request {_form_text}",
+        help=_REBASE_HELP,
     )
     parser.add_argument(
         "--git-username",
@@ -210,20 +213,24 @@ def main():
     """Rebase Bot entry point function."""
     args = _parse_cli_arguments()
 
+    # bot pulls in git, github3 and requests, which are slow to import.
+    # Only load them once the arguments are known to be good.
+    from rebasebot import bot  # pylint: disable=import-outside-toplevel
+
     gh_app_key = ""
     if args.github_app_key is not None:
-        with open(args.github_app_key, "r", encoding='utf-8') as app_key_file:
-            gh_app_key = app_key_file.read().strip().encode()
+        with open(args.github_app_key, "rb") as app_key_file:
+            gh_app_key = app_key_file.read().strip()
 
     gh_cloner_key = ""
     if args.github_cloner_key is not None:
-        with open(args.github_cloner_key, "r", encoding='utf-8') as app_key_file:
-            gh_cloner_key = app_key_file.read().strip().encode()
+        with open(args.github_cloner_key, "rb") as app_key_file:
+            gh_cloner_key = app_key_file.read().strip()
 
     gh_user_token = ""
     if args.github_user_token is not None:
         with open(args.github_user_token, "r", encoding='utf-8') as app_key_file:
-            gh_user_token = app_key_file.read().strip().encode().decode('utf-8')
+            gh_user_token = app_key_file.read().strip()
 
     slack_webhook = None
     if args.slack_webhook is not None:
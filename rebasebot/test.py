@@ -53,6 +53,65 @@ def make_golang_repo(tmp_dir):
     return Repo.init(tmp_dir)
 
 
+def write_go_module(tmp_dir, dep_version):
+    with open(os.path.join(tmp_dir, "go.mod"), "w") as f:
+        f.write(
+            "module example.com/foo\n\n"
+            "go 1.16\n\n"
+            f"require example.com/dep {dep_version}\n"
+        )
+    with open(os.path.join(tmp_dir, "go.sum"), "w") as f:
+        f.write(f"example.com/dep {dep_version} h1:test\n")
+
+
+def write_vendor(tmp_dir, dep_version, packages=("example.com/dep",)):
+    os.makedirs(os.path.join(tmp_dir, "vendor"), exist_ok=True)
+    with open(os.path.join(tmp_dir, "vendor", "modules.txt"), "w") as f:
+        f.write(f"# example.com/dep {dep_version}\n## explicit\n")
+        for package in packages:
+            f.write(f"{package}\n")
+    for package in packages:
+        package_dir = os.path.join(tmp_dir, "vendor", package)
+        os.makedirs(package_dir, exist_ok=True)
+        with open(os.path.join(package_dir, "dep.go"), "w") as f:
+            f.write(f"package {os.path.basename(package)}\n")
+
+
+def write_main(tmp_dir, imports):
+    with open(os.path.join(tmp_dir, "main.go"), "w") as f:
+        f.write("package main\n\n")
+        for package in imports:
+            f.write(f'import _ "{package}"\n')
+        f.write("\nfunc main() {}\n")
+
+
+def make_conflicting_repo(tmp_dir, filename):
+    # The source branch modifies a file which master deletes, so rebasing
+    # master onto source results in a modify/delete (UD) conflict.
+    repo = Repo.init(tmp_dir)
+    test_file = os.path.join(tmp_dir, filename)
+
+    with open(test_file, "x") as f:
+        f.write("initial\n")
+    repo.git.add(all=True)
+    repo.git.commit("-m", "Initial commit")
+    repo.git.branch("upstream")
+
+    repo.git.rm(filename)
+    repo.git.commit("-m", "Remove file")
+
+    repo.git.checkout("upstream")
+    with open(test_file, "w") as f:
+        f.write("modified\n")
+    repo.git.commit("-am", "Modify file")
+    repo.git.checkout("master")
+
+    source = cli.GitBranch(tmp_dir, "upstream")
+    repo.create_remote("source", source.url)
+    repo.remotes.source.fetch(source.branch)
+    return repo, source
+
+
 class test_cli(unittest.TestCase):
     def test_valid_cli_argmuents(self):
         args = cli._parse_cli_arguments(args_dict_to_list(valid_args))
@@ -148,6 +207,207 @@ class test_go_mod(unittest.TestCase):
             os.chdir(working_dir)
             os.system("rm -rf " + str(tmp_dir))
 
+    # A downstream carry removed go.sum, which the source still has. It must
+    # be restored from the source along with go.mod.
+    def test_reset_restores_file_missing_locally(self):
+        tmp_dir = os.path.join(os.getcwd(), "tmp")
+        os.mkdir(tmp_dir)
+        repo = Repo.init(tmp_dir)
+
+        os.chdir(tmp_dir)
+        try:
+            write_go_module(tmp_dir, "v1.0.0")
+            repo.git.add(all=True)
+            repo.git.commit("-m", "Initial commit")
+            repo.git.branch("upstream")
+
+            repo.git.rm("go.sum")
+            repo.git.commit("-m", "UPSTREAM: <carry>: Remove go.sum")
+
+            repo.git.checkout("upstream")
+            write_go_module(tmp_dir, "v2.0.0")
+            repo.git.commit("-am", "Bump example.com/dep")
+            repo.git.checkout("master")
+
+            source = cli.GitBranch(tmp_dir, "upstream")
+            repo.create_remote("source", source.url)
+            repo.remotes.source.fetch(source.branch)
+
+            bot._reset_go_mod_files(repo, source)
+
+            for filename in ("go.mod", "go.sum"):
+                with open(filename) as f:
+                    self.assertEqual(
+                        f.read(),
+                        repo.git.show(f"source/{source.branch}:{filename}") + "\n",
+                    )
+        finally:
+            # clean up
+            os.chdir(working_dir)
+            os.system("rm -rf " + str(tmp_dir))
+
+    # A downstream carry added go.sum, which the source doesn't have. go.mod
+    # is still reset to the source instead of the checkout failing.
+    def test_reset_file_missing_in_source(self):
+        tmp_dir = os.path.join(os.getcwd(), "tmp")
+        os.mkdir(tmp_dir)
+        repo = Repo.init(tmp_dir)
+
+        os.chdir(tmp_dir)
+        try:
+            write_go_module(tmp_dir, "v1.0.0")
+            repo.git.add("go.mod")
+            repo.git.commit("-m", "Initial commit")
+            repo.git.branch("upstream")
+
+            repo.git.add("go.sum")
+            repo.git.commit("-m", "UPSTREAM: <carry>: Add go.sum")
+
+            repo.git.checkout("upstream")
+            write_go_module(tmp_dir, "v2.0.0")
+            repo.git.commit("-m", "Bump example.com/dep", "go.mod")
+            os.remove("go.sum")
+            repo.git.checkout("master")
+
+            source = cli.GitBranch(tmp_dir, "upstream")
+            repo.create_remote("source", source.url)
+            repo.remotes.source.fetch(source.branch)
+
+            bot._reset_go_mod_files(repo, source)
+
+            with open("go.mod") as f:
+                self.assertEqual(
+                    f.read(),
+                    repo.git.show(f"source/{source.branch}:go.mod") + "\n",
+                )
+            self.assertTrue(os.path.exists("go.sum"))
+        finally:
+            # clean up
+            os.chdir(working_dir)
+            os.system("rm -rf " + str(tmp_dir))
+
+    # Upstream bumps a dependency but doesn't vendor, while a downstream carry
+    # adds vendor/. After the rebase go.mod matches the source, but vendor/
+    # still has the old version and must be updated.
+    def test_vendor_stale_after_rebase(self):
+        tmp_dir = os.path.join(os.getcwd(), "tmp")
+        os.mkdir(tmp_dir)
+        repo = Repo.init(tmp_dir)
+
+        os.chdir(tmp_dir)
+        try:
+            write_go_module(tmp_dir, "v1.0.0")
+            write_main(tmp_dir, ["example.com/dep"])
+            repo.git.add(all=True)
+            repo.git.commit("-m", "Initial commit")
+            repo.git.branch("upstream")
+
+            write_vendor(tmp_dir, "v1.0.0")
+            repo.git.add(all=True)
+            repo.git.commit("-m", "UPSTREAM: <carry>: Vendor go modules")
+
+            repo.git.checkout("upstream")
+            write_go_module(tmp_dir, "v2.0.0")
+            repo.git.commit("-am", "Bump example.com/dep")
+            repo.git.checkout("master")
+
+            source = cli.GitBranch(tmp_dir, "upstream")
+            repo.create_remote("source", source.url)
+            repo.remotes.source.fetch(source.branch)
+            repo.git.rebase(f"source/{source.branch}")
+
+            self.assertTrue(bot._go_modules_changed(repo))
+        finally:
+            # clean up
+            os.chdir(working_dir)
+            os.system("rm -rf " + str(tmp_dir))
+
+    # Upstream starts importing a new package from a module go.mod already
+    # requires, so go.mod and go.sum don't change, but the package must be
+    # added to the downstream vendor/.
+    def test_vendor_missing_package_after_rebase(self):
+        tmp_dir = os.path.join(os.getcwd(), "tmp")
+        os.mkdir(tmp_dir)
+        repo = Repo.init(tmp_dir)
+
+        os.chdir(tmp_dir)
+        try:
+            write_go_module(tmp_dir, "v1.0.0")
+            write_main(tmp_dir, ["example.com/dep"])
+            repo.git.add(all=True)
+            repo.git.commit("-m", "Initial commit")
+            repo.git.branch("upstream")
+
+            write_vendor(tmp_dir, "v1.0.0")
+            repo.git.add(all=True)
+            repo.git.commit("-m", "UPSTREAM: <carry>: Vendor go modules")
+            self.assertFalse(bot._go_modules_changed(repo))
+
+            repo.git.checkout("upstream")
+            write_main(tmp_dir, ["example.com/dep", "example.com/dep/sub"])
+            repo.git.commit("-am", "Use example.com/dep/sub")
+            repo.git.checkout("master")
+
+            source = cli.GitBranch(tmp_dir, "upstream")
+            repo.create_remote("source", source.url)
+            repo.remotes.source.fetch(source.branch)
+            repo.git.rebase(f"source/{source.branch}")
+
+            self.assertTrue(bot._go_modules_changed(repo))
+        finally:
+            # clean up
+            os.chdir(working_dir)
+            os.system("rm -rf " + str(tmp_dir))
+
+    # When vendor/ is consistent with the unchanged go.mod no go command is
+    # run and nothing is committed.
+    def test_vendor_up_to_date(self):
+        tmp_dir = os.path.join(os.getcwd(), "tmp")
+        os.mkdir(tmp_dir)
+        repo = Repo.init(tmp_dir)
+
+        os.chdir(tmp_dir)
+        try:
+            write_go_module(tmp_dir, "v1.0.0")
+            write_main(tmp_dir, ["example.com/dep"])
+            write_vendor(tmp_dir, "v1.0.0")
+            repo.git.add(all=True)
+            repo.git.commit("-m", "Initial commit")
+
+            source = cli.GitBranch(tmp_dir, "master")
+            repo.create_remote("source", source.url)
+            repo.remotes.source.fetch(source.branch)
+
+            self.assertFalse(bot._go_modules_changed(repo))
+            bot._commit_go_mod_updates(repo, source)
+
+            commits = list(repo.iter_commits())
+            self.assertEqual(len(commits), 1)
+        finally:
+            # clean up
+            os.chdir(working_dir)
+            os.system("rm -rf " + str(tmp_dir))
+
+
+class test_rebase(unittest.TestCase):
+    def test_resolve_modify_delete_conflict(self):
+        tmp_dir = os.path.join(os.getcwd(), "tmp")
+        # Non-ascii and whitespace in the name are quoted by git status
+        # unless -z is used.
+        filename = "spécial file.txt"
+        repo, source = make_conflicting_repo(tmp_dir, filename)
+
+        try:
+            bot._do_rebase(repo, source)
+
+            self.assertFalse(os.path.exists(os.path.join(tmp_dir, filename)))
+            commits = list(repo.iter_commits())
+            self.assertEqual(len(commits), 3)
+            self.assertEqual(commits[0].summary, "Remove file")
+        finally:
+            # clean up
+            os.system("rm -rf " + str(tmp_dir))
+
 
 if __name__ == "__main__":
     unittest.main()